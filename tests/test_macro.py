@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+from zendown.macro import block_macro, inline_macro, pure
+
+calls = []
+
+
+@pure
+@inline_macro
+def below(ctx, arg: str) -> str:
+    calls.append(arg)
+    return arg.upper()
+
+
+@inline_macro
+@pure
+def above(ctx, arg: str) -> str:
+    calls.append(arg)
+    return arg.upper()
+
+
+@block_macro
+@pure
+def block(ctx, arg: str, children) -> str:
+    calls.append(arg)
+    return f"{arg}:{len(children or [])}"
+
+
+# Populated by the macro decorators above.
+macros = globals()["_macros"]
+
+
+def make_ctx(builder: str = "html"):
+    return SimpleNamespace(
+        builder=SimpleNamespace(name=builder),
+        renderer=SimpleNamespace(options=None),
+    )
+
+
+def test_pure_decorator_order():
+    assert macros["below"].pure
+    assert macros["above"].pure
+
+
+def test_pure_macro_is_cached():
+    calls.clear()
+    macro = macros["below"]
+    ctx = make_ctx()
+    assert macro(ctx, "x", None) == "X"
+    assert macro(ctx, "x", None) == "X"
+    assert calls == ["x"]
+    assert macro(make_ctx("latex"), "x", None) == "X"
+    assert calls == ["x", "x"]
+
+
+def test_pure_macro_not_cached_with_block():
+    calls.clear()
+    macro = macros["block"]
+    ctx = make_ctx()
+    assert macro(ctx, "x", []) == "x:0"
+    assert macro(ctx, "x", []) == "x:0"
+    assert calls == ["x", "x"]
+    assert not macro.cache
+
+
+def test_pure_macro_cache_eviction():
+    calls.clear()
+    macro = macros["above"]
+    macro.cache.clear()
+    ctx = make_ctx()
+    for i in range(macro.MAX_CACHE_SIZE + 1):
+        macro(ctx, str(i), None)
+    assert len(macro.cache) == 1
+    assert macro(ctx, str(macro.MAX_CACHE_SIZE), None) == str(macro.MAX_CACHE_SIZE)
+    assert len(calls) == macro.MAX_CACHE_SIZE + 1
@@ -5,15 +5,18 @@ from __future__ import annotations
 import logging
 import re
 from pathlib import Path
+from types import MappingProxyType
 from typing import (
     TYPE_CHECKING,
     Callable,
     Container,
     Dict,
+    FrozenSet,
     List,
     Optional,
     Sequence,
     Set,
+    Tuple,
     cast,
 )
 
@@ -44,6 +47,8 @@ class Section:
     tokenization is flat with respect to headings.
     """
 
+    __slots__ = ("heading", "node", "blocks")
+
     def __init__(self, heading: Heading, node: Node[Section]):
         self.heading = heading
         self.node = node
@@ -59,6 +64,11 @@ Anchor = Label[Section]
 GenLabelFn = Callable[[Heading, Container[Anchor]], Anchor]
 
 
+def gen_id_label(heading: Heading, _: Container[Anchor]) -> Anchor:
+    """Generate a label for a heading from its object id."""
+    return Label(str(id(heading)))
+
+
 def parse_sections(
     tokens: Sequence[BlockToken], gen_label: Optional[GenLabelFn] = None
 ) -> Tree[Section]:
@@ -68,19 +78,21 @@ def parse_sections(
     Otherwise, unspecified integers will be used.
     """
     if not gen_label:
-        gen_label = lambda heading, used: Label(str(id(heading)))
+        gen_label = gen_id_label
     tree: Tree[Section] = Tree()
     parent = tree.root
-    blocks = []
     node = None
     used: Set[Anchor] = set()
-    for token in tokens:
+    # Sections that extend to the current token, with their heading indices. A
+    # section covers all tokens up to the next heading of the same or lower
+    # level, so its blocks are a contiguous slice of tokens.
+    open_sections: List[Tuple[Section, int]] = []
+    for i, token in enumerate(tokens):
         if not isinstance(token, Heading):
-            blocks.append(token)
             continue
-        if node:
-            node.item.blocks = blocks
-        blocks = []
+        while open_sections and token.level <= open_sections[-1][0].heading.level:
+            section, start = open_sections.pop()
+            section.blocks = list(tokens[start + 1 : i])
         label = gen_label(token, used)
         used.add(label)
         if node and token.level > node.item.heading.level:
@@ -90,21 +102,11 @@ def parse_sections(
                 assert parent.parent
                 parent = parent.parent
         node = parent.add_child(label)
-        tree.register(node, Section(token, node))
-    if node:
-        assert node.item
-        node.item.blocks = blocks
-
-    # At this point, the Section objects only store the blocks up to the
-    # next heading. Extend them to cover all the blocks in their subtree.
-    def extend_blocks(node: Node[Section]) -> List[BlockToken]:
-        assert node.item
-        for child in node.children.values():
-            node.item.blocks.extend(extend_blocks(child))
-        return [node.item.heading] + node.item.blocks
-
-    for node in tree.root.children.values():
-        extend_blocks(node)
+        section = Section(token, node)
+        tree.register(node, section)
+        open_sections.append((section, i))
+    for section, start in open_sections:
+        section.blocks = list(tokens[start + 1 :])
     return tree
 
 
@@ -132,16 +134,20 @@ class ArticleConfig(Config):
 
     """Article configuration header."""
 
-    required = {
-        "title": "Untitled Article",
-    }
+    required = MappingProxyType({"title": "Untitled Article"})
+
+    optional = MappingProxyType(
+        {
+            "slug": None,  # default set in Article.load
+            "subtitle": None,
+            "tags": [],
+            "order": [],  # used in index articles to specify order of children
+        }
+    )
+
 
-    optional = {
-        "slug": None,  # default set in Article.load
-        "subtitle": None,
-        "tags": [],
-        "order": [],  # used in index articles to specify order of children
-    }
+# Line separating the configuration header from the body in an article.
+SEPARATOR = re.compile(r"^---[^\S\n]*$", re.MULTILINE)
 
 
 class ResolveError(Exception):
@@ -170,6 +176,18 @@ class Article(Resource):
     rendered results are not stored in the object.
     """
 
+    __slots__ = (
+        "cfg_only",
+        "cfg",
+        "raw",
+        "_tags",
+        "_doc",
+        "_sections",
+        "_links",
+        "_assets",
+        "_includes",
+    )
+
     node: Node[Article]
 
     def __init__(self, path: Path, node: Node[Article]):
@@ -177,6 +195,7 @@ class Article(Resource):
         self.cfg_only = path.suffix == ".yml"
         self.cfg: Optional[ArticleConfig] = None
         self.raw: Optional[str] = None
+        self._tags: Optional[FrozenSet[str]] = None
         self._doc: Optional[Document] = None
         self._sections: Optional[Tree[Section]] = None
         self._links: Optional[List[Interlink]] = None
@@ -197,20 +216,23 @@ class Article(Resource):
     def _unload(self):
         self.raw = None
         self.cfg = None
+        self._tags = None
 
     def _load(self):
-        with self.open_file() as f:
-            head = ""
-            for line in f:
-                if line.rstrip() == "---":
-                    if self.cfg_only:
-                        logging.error("article %s should be .md, not .yml", self.path)
-                    break
-                head += line
-            else:
-                if not self.cfg_only:
-                    logging.error("article %s should be .yml, not .md", self.path)
-            body = f.read()
+        text = self.read_file()
+        # Split with one regex search rather than accumulating lines, so that
+        # only the configuration header is handed to the YAML parser.
+        match = SEPARATOR.search(text)
+        if match:
+            if self.cfg_only:
+                logging.error("article %s should be .md, not .yml", self.path)
+            head = text[: match.start()]
+            body = text[match.end() + 1 :]
+        else:
+            if not self.cfg_only:
+                logging.error("article %s should be .yml, not .md", self.path)
+            head = text
+            body = ""
         if self.is_index():
             default_slug = slugify(self.path.parent.name)
         else:
@@ -234,6 +256,15 @@ class Article(Resource):
         assert self.cfg is not None
         return self.cfg["slug"]
 
+    @property
+    def tags(self) -> FrozenSet[str]:
+        """Return the set of tags of the article."""
+        if self._tags is None:
+            self.ensure_loaded()
+            assert self.cfg is not None
+            self._tags = frozenset(self.cfg["tags"])
+        return self._tags
+
     def is_parsed(self) -> bool:
         return self._doc is not None
 
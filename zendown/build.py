@@ -4,6 +4,7 @@ import html
 import json
 import logging
 import os.path
+import posixpath
 import shlex
 import subprocess
 import webbrowser
@@ -24,7 +25,7 @@ from typing import (
     Tuple,
     Type,
 )
-from urllib.parse import quote
+from urllib.parse import quote, quote_from_bytes
 
 import pypandoc
 import pyperclip
@@ -33,13 +34,25 @@ from jinja2 import Environment, PackageLoader, escape, select_autoescape
 from zendown import templates
 from zendown.article import Article, Index, Interlink
 from zendown.config import Config
-from zendown.files import FileSystem
+from zendown.files import FileSystem, walk_files
 from zendown.project import Project
 from zendown.resource import Asset
+from zendown.targets import BUILDER_NAMES
 from zendown.tree import Label, Node
 from zendown.zfm import Context, RenderOptions, ZFMRenderer
 
 
+# Maps ASCII characters that urllib.parse.quote would escape to their escapes.
+_QUOTE_TABLE = {i: quote(chr(i)) for i in range(128) if quote(chr(i)) != chr(i)}
+
+
+def quote_url(s: str) -> str:
+    """Percent-encode s like urllib.parse.quote, with a fast path for ASCII."""
+    if s.isascii():
+        return s.translate(_QUOTE_TABLE)
+    return quote_from_bytes(s.encode())
+
+
 class Options(NamedTuple):
 
     """Options for building."""
@@ -66,10 +79,24 @@ class Builder(ABC):
             out_dir = project.fs.join(Path("out") / self.name)
             self.fs = FileSystem(out_dir)
 
-    def clean(self):
-        """Delete the contents of the output directory."""
-        if self.needs_fs:
+    def clean(self, hard: bool = False):
+        """Delete stale files from the output directory.
+
+        By default, only deletes files that the builder would not produce if it
+        built all articles, leaving the rest to be overwritten. If hard is True
+        (or the builder cannot list its outputs), deletes the whole directory.
+        """
+        if not self.needs_fs:
+            return
+        keep = None if hard else self.outputs()
+        if keep is None:
             rmtree(self.fs.root, ignore_errors=True)
+        elif os.path.isdir(self.fs.root):
+            remove_stale(self.fs.root, keep)
+
+    def outputs(self) -> Optional[Set[Path]]:
+        """Return the paths of all outputs, or None if unknown."""
+        return None
 
     def context(self, article: Article) -> Context:
         """Return a Context object for macros in an article."""
@@ -135,42 +162,87 @@ class Html(Builder):
         self.css = resources.open_text(templates, "style.css").read()
         self.index_template = self.env.get_template("index.html.jinja")
         self.article_template = self.env.get_template("article.html.jinja")
-
-    def node_path(self, node: Optional[Node[Article]]) -> Path:
+        # Cache of article_url results. Cleared on each build since slugs come
+        # from article configs, which can change in --watch mode.
+        self._article_urls: Dict[Article, str] = {}
+        # Cache of relative URLs between articles, keyed by (source, dest).
+        self._relative_urls: Dict[Tuple[Article, Article], str] = {}
+        # Snapshot of asset files, taken at the start of each build.
+        self._asset_paths: Set[Path] = set()
+
+    def node_url(self, node: Optional[Node[Article]]) -> str:
+        """Return the URL of a node's directory, relative to the output root."""
         slugs: List[str] = []
         while node and not node.is_root():
-            slugs.insert(0, Index(node).slug)
+            slugs.append(Index(node).slug)
             node = node.parent
-        return Path("/".join(slugs))
+        return "/".join(reversed(slugs))
+
+    def article_url(self, article: Article) -> str:
+        """Return the URL of an article, relative to the output root."""
+        url = self._article_urls.get(article)
+        if url is None:
+            if article.is_index():
+                assert article.node.parent
+                url = self.index_url(article.node.parent)
+            else:
+                url = f"{article.slug}.html"
+                directory = self.node_url(article.node.parent)
+                if directory:
+                    url = f"{directory}/{url}"
+            self._article_urls[article] = url
+        return url
+
+    def index_url(self, node: Node[Article]) -> str:
+        """Return the URL of an index page, relative to the output root."""
+        directory = self.node_url(node)
+        return f"{directory}/index.html" if directory else "index.html"
 
     def article_path(self, article: Article) -> Path:
-        if article.is_index():
-            assert article.node.parent
-            return self.index_path(article.node.parent)
-        path = self.node_path(article.node.parent) / article.slug
-        return self.fs.join(path.with_suffix(".html"))
+        return self.fs.join(self.article_url(article))
 
     def index_path(self, node: Node[Article]) -> Path:
-        return self.fs.join(self.node_path(node) / "index.html")
+        return self.fs.join(self.index_url(node))
+
+    def outputs(self) -> Optional[Set[Path]]:
+        paths = {self.fs.join("assets"), self.fs.join("style.css")}
+        stack = [self.project.articles.root]
+        while stack:
+            node = stack.pop()
+            if node.children:
+                paths.add(self.index_path(node))
+                stack.extend(node.children.values())
+            elif node.item and not node.item.is_index():
+                paths.add(self.article_path(node.item))
+        return paths
 
     def _resolve_link(self, ctx: Context, link: Interlink) -> str:
         if link.article is ctx.article:
             rel = ""
         else:
-            source = self.article_path(ctx.article).parent
-            dest = self.article_path(link.article)
-            rel = quote(os.path.relpath(dest, source))
+            key = (ctx.article, link.article)
+            cached = self._relative_urls.get(key)
+            if cached is None:
+                source = posixpath.dirname(self.article_url(ctx.article)) or "."
+                dest = self.article_url(link.article)
+                cached = quote_url(posixpath.relpath(dest, source))
+                self._relative_urls[key] = cached
+            rel = cached
         if link.section:
             return f"{rel}#{link.section.node.label}"
         return rel or "#"
 
     def _resolve_asset(self, ctx: Context, asset: Asset) -> str:
         path = asset.path
-        if not self.project.fs.join(path).exists():
+        # The snapshot skips symlinked directories, so check those directly.
+        if path not in self._asset_paths and not self.project.fs.join(path).exists():
             logging.error("%s: asset %s does not exist", ctx.article.path, path)
-        return self.relative_base(ctx.article.node, -1) + quote(str(path))
+        return self.relative_base(ctx.article.node, -1) + quote_url(str(path))
 
     def _build(self, articles: Sequence[Article]):
+        self._article_urls.clear()
+        self._relative_urls.clear()
+        self._asset_paths = set(walk_files(self.project.fs.join("assets")))
         assets = self.fs.join("assets")
         if not assets.exists():
             relative = os.path.relpath(self.project.fs.join("assets"), self.fs.root)
@@ -206,7 +278,8 @@ class Html(Builder):
                 self.write_index(Index(node), f)
 
     def write_article(self, article: Article, out: TextIO):
-        article.ensure_resolved(self.project)
+        # Html._build already resolved the article.
+        assert article.is_resolved()
         ctx = self.context(article)
         with ZFMRenderer(ctx, RenderOptions(shift_headings_by=1)) as r:
             body = article.render(r)
@@ -223,7 +296,6 @@ class Html(Builder):
         article = index.article
         if article:
             ctx = self.context(article)
-            article.ensure_loaded()
             if not article.cfg_only:
                 article.ensure_resolved(self.project)
                 with ZFMRenderer(ctx, RenderOptions(shift_headings_by=1)) as r:
@@ -292,6 +364,9 @@ class Hubspot(Builder):
                 project.cfg.path,
             )
         self.asset_base = self.config(project.cfg, "hubspot_asset_base").rstrip("/")
+        # Validated hubspot_id values, filled on demand since the builder only
+        # ever needs the ids of the articles being built.
+        self._article_ids: Dict[Article, Any] = {}
 
     def config(self, cfg: Config, key: str) -> Any:
         value = cfg.get(key)
@@ -307,16 +382,21 @@ class Hubspot(Builder):
     def index_url(self, node: Node[Article]) -> str:
         return f"{self.base_url}/{Index(node).slug}"
 
+    def article_id(self, article: Article) -> Any:
+        article_id = self._article_ids.get(article)
+        if article_id is None:
+            article.ensure_loaded()
+            assert article.cfg
+            article_id = self.config(article.cfg, "hubspot_id")
+            self._article_ids[article] = article_id
+        return article_id
+
     def article_edit_url(self, article: Article) -> str:
-        article.ensure_loaded()
-        assert article.cfg
-        article_id = self.config(article.cfg, "hubspot_id")
+        article_id = self.article_id(article)
         return f"https://app.hubspot.com/knowledge/{self.company_id}/edit/{article_id}"
 
     def article_api_url(self, article: Article) -> str:
-        article.ensure_loaded()
-        assert article.cfg
-        article_id = self.config(article.cfg, "hubspot_id")
+        article_id = self.article_id(article)
         return f"https://api.hubspot.com/knowledge-content/v1/knowledge-articles/{article_id}?portalId={self.company_id}"
 
     def _resolve_link(self, ctx: Context, link: Interlink) -> str:
@@ -327,7 +407,7 @@ class Hubspot(Builder):
 
     def _resolve_asset(self, ctx: Context, asset: Asset) -> str:
         path = self.asset_base / asset.path.relative_to(self.project.fs.join("assets"))
-        return f"{self.base_url}/hs-fs/hubfs/{quote(str(path))}"
+        return f"{self.base_url}/hs-fs/hubfs/{quote_url(str(path))}"
 
     def _build(self, articles: Sequence[Article]):
         if not articles:
@@ -602,10 +682,37 @@ class Latex(Builder):
         else:
             out.write(f"<h{level}>{index.title} (MISSING TITLE!)</h{level}>")
 
+    def outputs(self) -> Optional[Set[Path]]:
+        return {self.fs.join("build.html")}
+
     def _open(self, article: Optional[Article]):
         logging.fatal("cannot open latex builder")
 
 
+def remove_stale(root: Path, keep: Set[Path]) -> bool:
+    """Recursively delete everything in root except the paths in keep.
+
+    Directories left empty are removed too. Symlinks are never followed. Returns
+    true if root is now empty.
+    """
+    empty = True
+    with os.scandir(root) as it:
+        for entry in it:
+            path = root / entry.name
+            if path in keep:
+                empty = False
+            elif entry.is_dir(follow_symlinks=False):
+                if remove_stale(path, keep):
+                    logging.debug("removing stale directory %s", path)
+                    path.rmdir()
+                else:
+                    empty = False
+            else:
+                logging.debug("removing stale file %s", path)
+                path.unlink()
+    return empty
+
+
 def sorted_child_articles(index: Index) -> Iterable[Node[Article]]:
     if index.article:
         index.article.ensure_loaded()
@@ -614,10 +721,8 @@ def sorted_child_articles(index: Index) -> Iterable[Node[Article]]:
         order = cfg["order"]
         if order:
             for name in order:
-                child = next(
-                    (n for n in index.node.children.values() if n.label == Label(name)),
-                    None,
-                )
+                # YAML parses names like 2019 as numbers, but labels are strings.
+                child = index.node.children.get(Label(str(name)))
                 if not child:
                     logging.fatal(
                         "%s: in 'order': %s does not exist", index.article.path, name
@@ -654,3 +759,5 @@ def sorted_sibling_articles(articles: Sequence[Article]) -> Iterable[Node[Articl
 _builder_list: List[Type[Builder]] = [Html, Hubspot, Latex]
 
 builders = {b.name: b for b in _builder_list}
+
+assert tuple(builders) == BUILDER_NAMES, "update zendown.targets.BUILDER_NAMES"
@@ -1,20 +1,21 @@
 """Command-line interface."""
 
+# Most imports are deferred to the command functions that need them, since
+# modules like zendown.build and zendown.watch are slow to import.
+# pylint: disable=import-outside-toplevel
+
 import logging
 import sys
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
-from typing import Mapping, Tuple
+from typing import Any, Callable, Mapping, Sequence, Tuple
 
-from zendown.build import Options, builders
-from zendown.files import create_project
 from zendown.logs import setup_logging
-from zendown.project import Project
-from zendown.watch import Server, Watcher
+from zendown.targets import BUILDER_NAMES
 
 
 def main():
-    parser, commands = get_parser()
+    parser, commands = get_parser(sys.argv[1:])
     args = parser.parse_args()
     if args.command == "help":
         if args.help_target:
@@ -29,21 +30,39 @@ def main():
     elif args.verbose and args.verbose >= 2:
         log_level = logging.DEBUG
     exit_level = logging.ERROR
-    if args.keep_going or getattr(args, "watch", False):
+    if args.keep_going or args.watch:
         exit_level = logging.FATAL
+    # This is needed even at the default levels: besides formatting, the
+    # handler it installs is what exits the program on errors and fatal logs.
+    # The help command returns above, so it never pays for this.
     setup_logging(sys.stderr, log_level, exit_level)
 
-    command = globals()[f"command_{args.command}"]
-    assert command, "unexpected command name"
-    command(args)
+    args.func(args)
+
 
+def get_parser(
+    argv: Sequence[str],
+) -> Tuple[ArgumentParser, Mapping[str, ArgumentParser]]:
+    """Create the argument parser for the given command-line arguments.
 
-def get_parser() -> Tuple[ArgumentParser, Mapping[str, ArgumentParser]]:
+    Only creates the subparser for the command named in argv, since the others
+    will not be used. Creates all of them if argv does not name a command, or
+    names the help command, so that help messages and errors can list them.
+    """
     parser = ArgumentParser(
         prog="zendown", description="tool for building Zendown projects"
     )
     commands = parser.add_subparsers(metavar="command", dest="command", required=True)
+    command = next((arg for arg in argv if not arg.startswith("-")), None)
+    if command is not None and command in subparsers and command != "help":
+        subparsers[command](commands)
+    else:
+        for add_subparser in subparsers.values():
+            add_subparser(commands)
+    return parser, commands.choices
+
 
+def add_parser_help(commands: Any):
     parser_help = commands.add_parser("help", help="show this help message and exit")
     parser_help.add_argument(
         metavar="command",
@@ -52,9 +71,15 @@ def get_parser() -> Tuple[ArgumentParser, Mapping[str, ArgumentParser]]:
         help="get help for a specific command",
     )
 
+
+def add_parser_new(commands: Any):
     parser_new = commands.add_parser("new", help="create a new project")
     parser_new.add_argument("name", help="project name")
+    add_common_arguments(parser_new)
+    parser_new.set_defaults(func=command_new, watch=False)
 
+
+def add_parser_list(commands: Any):
     parser_list = commands.add_parser("list", help="list project items")
     parser_list.add_argument(
         "-f", "--files", action="store_true", help="show file paths instead of refs"
@@ -66,12 +91,23 @@ def get_parser() -> Tuple[ArgumentParser, Mapping[str, ArgumentParser]]:
         default="",
         help="filter articles by ref",
     )
+    add_common_arguments(parser_list)
+    parser_list.set_defaults(func=command_list, watch=False)
+
 
+def add_parser_build(commands: Any):
     parser_build = commands.add_parser("build", help="build the project")
-    parser_build.add_argument("builder", choices=builders.keys(), help="build target")
+    parser_build.add_argument(
+        "builder", choices=BUILDER_NAMES, help="build target",
+    )
     parser_build.add_argument(
         "-c", "--clean", action="store_true", help="clean the build directory first",
     )
+    parser_build.add_argument(
+        "--hard",
+        action="store_true",
+        help="with --clean, delete the whole build directory",
+    )
     parser_build.add_argument(
         "-w",
         "--watch",
@@ -104,40 +140,62 @@ def get_parser() -> Tuple[ArgumentParser, Mapping[str, ArgumentParser]]:
         default="",
         help="filter articles by ref",
     )
+    add_common_arguments(parser_build)
+    parser_build.set_defaults(func=command_build)
 
-    for subparser in [parser_new, parser_list, parser_build]:
-        subparser.add_argument(
-            "-k",
-            "--keep-going",
-            action="store_true",
-            help="keep going if there are errors",
-        )
-        subparser.add_argument(
-            "-v",
-            "--verbose",
-            action="count",
-            help="increase loggging (can use multiple times)",
-        )
 
-    return parser, commands.choices
+def add_common_arguments(subparser: ArgumentParser):
+    subparser.add_argument(
+        "-k",
+        "--keep-going",
+        action="store_true",
+        help="keep going if there are errors",
+    )
+    subparser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        help="increase loggging (can use multiple times)",
+    )
+
+
+# Functions that add subparsers, in the order they appear in help messages.
+subparsers: Mapping[str, Callable[[Any], None]] = {
+    "help": add_parser_help,
+    "new": add_parser_new,
+    "list": add_parser_list,
+    "build": add_parser_build,
+}
 
 
 def command_new(args: Namespace):
+    from zendown.files import create_project
+
     print(f"Creating a new Zendown project in {args.name}/")
     create_project(Path.cwd(), args.name)
 
 
 def command_list(args: Namespace):
+    from zendown.project import Project
+
     project = Project.find()
-    for article in project.queries(args.queries):
-        print(article.path if args.files else article.node.ref)
+    lines = [
+        str(article.path if args.files else article.node.ref)
+        for article in project.queries(args.queries)
+    ]
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
 def command_build(args: Namespace):
+    from zendown.build import Options, builders
+    from zendown.project import Project
+    from zendown.watch import Server, Watcher
+
     project = Project.find()
     builder = builders[args.builder](project, Options(flat=args.flat, top=args.top))
     if args.clean:
-        builder.clean()
+        builder.clean(hard=args.hard)
     if args.watch:
         if not builder.supports_watch:
             logging.fatal("build target %s does not support --watch", args.builder)
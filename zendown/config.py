@@ -1,21 +1,35 @@
 """Configuration file parser."""
 
 import logging
-from abc import ABC, abstractproperty
-from io import StringIO
+import os
+from abc import ABC
 from pathlib import Path
-from typing import Any, Dict, Mapping, Optional, TextIO, Type, TypeVar
-
-import yaml
+from typing import (
+    Any,
+    BinaryIO,
+    ClassVar,
+    Dict,
+    FrozenSet,
+    Mapping,
+    Optional,
+    TextIO,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 T = TypeVar("T", bound="Config")
 
+# Cache for Config.load, mapping paths to (mtime, size) and parsed data.
+_cache: Dict[Path, Tuple[Tuple[int, int], Mapping[str, Any]]] = {}
+
 
 class Config(ABC):
 
     """Abstract base class for YAML configuration.
 
-    Subclasses should override abstract properties "required" and "optional".
+    Subclasses must define the class attributes "required" and "optional".
 
     Example usage:
 
@@ -28,6 +42,26 @@ class Config(ABC):
     context-dependent (static defaults can go in the required/optional dicts).
     """
 
+    # Required configuration keys and their defaults. Subclasses should use a
+    # read-only MappingProxyType, since the defaults are shared by all instances.
+    required: ClassVar[Mapping[str, Any]]
+
+    # Optional configuration keys and their defaults (also a MappingProxyType).
+    optional: ClassVar[Mapping[str, Any]]
+
+    # Merged required and optional defaults, and the required keys, computed
+    # once per subclass.
+    _defaults: ClassVar[Dict[str, Any]]
+    _required_keys: ClassVar[FrozenSet[str]]
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        for attr in ("required", "optional"):
+            if not hasattr(cls, attr):
+                raise TypeError(f"{cls.__name__} must define {attr!r}")
+        cls._defaults = {**cls.required, **cls.optional}
+        cls._required_keys = frozenset(cls.required)
+
     def __init__(self, path: Path, data: Mapping[str, Any]):
         self.path = path
         self.data = data
@@ -36,42 +70,61 @@ class Config(ABC):
         name = self.__class__.__name__
         return f"{name}(path={self.path!r}, data={self.data!r})"
 
-    @abstractproperty
-    def required(self) -> Dict[str, Any]:
-        """Required configuration keys and their defaults."""
-
-    @abstractproperty
-    def optional(self) -> Dict[str, Any]:
-        """Optional configuration keys and their defaults."""
-
     def validate(self, **defaults: Any):
         """Validate the loaded configuration.
 
         This must be called manually after creating an instance.
 
         Extra defaults can be passed for keys as keyword arguments. They will
-        override the defaults from the "required" and "optional" properties.
+        override the defaults from the "required" and "optional" attributes.
         """
-        for key in self.required:
-            if key not in self.data:
-                logging.error("%s: missing %r", self.path, key)
-        self.data = {**self.required, **self.optional, **defaults, **self.data}
+        if not self._required_keys <= self.data.keys():
+            for key in self.required:
+                if key not in self.data:
+                    logging.error("%s: missing %r", self.path, key)
+        # Build a new dict rather than updating self.data, which may be shared
+        # with the Config.load cache.
+        data = self._defaults.copy()
+        if defaults:
+            data.update(defaults)
+        data.update(self.data)
+        self.data = data
 
     @classmethod
     def load(cls: Type[T], path: Path) -> T:
-        """Load configuration from a file."""
-        with open(path) as f:
-            return cls.load_from(path, f)
+        """Load configuration from a file.
+
+        The parsed data is cached by modification time and size, so loading an
+        unchanged file again does not re-parse it.
+        """
+        st = os.stat(path)
+        version = (st.st_mtime_ns, st.st_size)
+        cached = _cache.get(path)
+        if cached and cached[0] == version:
+            return cls(path, cached[1])
+        # Open in binary mode so that libyaml decodes the file itself.
+        with open(path, "rb") as f:
+            cfg = cls.load_from(path, f)
+        _cache[path] = (version, cfg.data)
+        return cfg
 
     @classmethod
     def loads(cls: Type[T], path: Path, content: str) -> T:
         """Load configuration from a string."""
-        return cls.load_from(path, StringIO(content))
+        return cls.load_from(path, content)
 
     @classmethod
-    def load_from(cls: Type[T], path: Path, content: TextIO) -> T:
+    def load_from(
+        cls: Type[T], path: Path, content: Union[str, TextIO, BinaryIO]
+    ) -> T:
+        """Load configuration from a string or (text or binary) file object."""
+        # Imported here since it is slow to import, and not all commands need it.
+        import yaml  # pylint: disable=import-outside-toplevel
+
+        # Use the libyaml loader if PyYAML was built with it.
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
         try:
-            data = yaml.safe_load(content)
+            data = yaml.load(content, Loader=loader)
         except yaml.YAMLError as ex:
             logging.error("cannot parse %s: %s", path, ex)
             data = {}
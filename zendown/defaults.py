@@ -8,21 +8,19 @@ from zendown import example_macros
 
 def structure(name: str) -> Dict[str, Any]:
     """Default project structure."""
-    with open(example_macros.__file__) as f:
-        macros_py = f.read()
     return {
         name: {
             ".gitignore": gitignore,
             "macros.py": macros_py,
-            "zendown.yml": zendown_yml(name),
+            "zendown.yml": zendown_yml(name).encode(),
             "content": {"first.md": first_md},
             "includes": {"notice.md": notice_md},
-            "assets": {"tiger.jpg": b64decode(tiger_jpg_base64)},
+            "assets": {"tiger.jpg": tiger_jpg},
         }
     }
 
 
-gitignore = """\
+gitignore = b"""\
 # Zendown specific
 /out/
 
@@ -53,7 +51,7 @@ inline_code_macro: pop
 """.format
 
 
-first_md = """\
+first_md = b"""\
 title: My first article
 
 ---
@@ -88,7 +86,7 @@ Enjoy!
 """
 
 
-notice_md = """\
+notice_md = b"""\
 @note:
 > Greetings from includes/notice.md.
 """
@@ -110,3 +108,11 @@ DBGzLi+a9Q4eIhSv/8QAHxEAAwEAAQQDAAAAAAAAAAAAAAECEQMEEiFREyJB/9oACAECAQE/AGs1m6hz
 AgMAAAAAAAAAAAAAAQIREgMEIVEQMRMiQf/aAAgBAwEBPwCi2kZWeicYRWXYhWWUUaW3epy+CG1gn9nZ
 vNFVcBEePCn4eo/Zn+nyT7M7dszXRmz/2Q==
 """
+
+
+# Computed once on import rather than on every call to structure(). All file
+# contents are bytes, so create_project can write them without encoding.
+with open(example_macros.__file__, "rb") as _f:
+    macros_py = _f.read()
+tiger_jpg = b64decode(tiger_jpg_base64)
+del tiger_jpg_base64
@@ -22,18 +22,18 @@ from zendown.tokens import (
 
 @inline_macro
 def eval(ctx: Context, arg: str) -> str:
-    return ctx.render(raw_text(str(builtins.eval(arg))))
+    return ctx.render_one(raw_text(str(builtins.eval(arg))))
 
 
 @inline_macro
 def yell(ctx: Context, children: List[SpanToken]) -> str:
     transform_text(children, str.upper)
-    return ctx.render(children)
+    return ctx.render_many(children)
 
 
 @inline_macro
 def pop(ctx: Context, children: List[SpanToken]) -> str:
-    return ctx.render(strong(children))
+    return ctx.render_one(strong(children))
 
 
 @block_macro
@@ -43,7 +43,7 @@ def callout(ctx: Context, arg: str, children: List[BlockToken]) -> str:
         children[0].children[0:0] = [label, raw_text(": ")]
     else:
         children.insert(0, paragraph([label, raw_text(":")]))
-    return f'<div class="{arg}">\n{ctx.render(children)}\n</div>'
+    return f'<div class="{arg}">\n{ctx.render_many(children)}\n</div>'
 
 
 @block_macro
@@ -74,7 +74,7 @@ def defs(ctx: Context, children: List[BlockToken]) -> str:
         else:
             result.append(paragraph([label, raw_text(":")]))
         result.extend(blocks)
-    return ctx.render(result)
+    return ctx.render_many(result)
 
 
 @block_macro
@@ -84,4 +84,4 @@ def toc(ctx: Context) -> str:
         anchor_link = link(f"#{section.heading.identifier}", section.heading.children)
         items.append([paragraph([anchor_link])])
     result = [paragraph([raw_text("In this article:")]), bullet_list(items)]
-    return ctx.render(result)
+    return ctx.render_many(result)
@@ -3,41 +3,104 @@
 from __future__ import annotations
 
 import logging
-import os.path
+import os
+import stat
 from pathlib import Path
-from typing import Any, Mapping, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 from zendown import defaults
 from zendown.logs import fatal
 
 
+# Functions for converting file contents in a project structure to bytes.
+file_encoders: Dict[type, Callable[[Any], bytes]] = {
+    str: str.encode,
+    bytes: lambda data: data,
+}
+
+
 def create_project(root: Path, project_name: str):
     """Create the default project files and directories in root.
 
     Exits with a fatal log if root already exists.
     """
-
-    def create(root: Path, structure: Mapping[str, Any]):
+    dirs: List[Path] = []
+    files: List[Tuple[Path, bytes]] = []
+    stack = [(root, defaults.structure(project_name))]
+    while stack:
+        parent, structure = stack.pop()
         for name, val in structure.items():
-            path = root / name
+            path = parent / name
             if isinstance(val, dict):
-                path.mkdir()
-                create(path, val)
-            elif isinstance(val, str):
-                with open(path, "w") as f:
-                    f.write(val)
-            elif isinstance(val, bytes):
-                with open(path, "wb") as bf:
-                    bf.write(val)
-            else:
+                dirs.append(path)
+                stack.append((path, val))
+                continue
+            encode = file_encoders.get(type(val))
+            if not encode:
                 raise ValueError(f"unexpected type: {type(val)}")
+            files.append((path, encode(val)))
 
     try:
-        create(root, defaults.structure(project_name))
+        # Parents always come before their children in dirs.
+        for path in dirs:
+            path.mkdir()
+        for path, data in files:
+            write_new_file(path, data)
     except FileExistsError as ex:
         fatal("%s already exists", ex.filename)
 
 
+def write_new_file(path: Path, data: bytes):
+    """Create a file at path containing data.
+
+    Raises FileExistsError if the file already exists.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
+
+
+def file_mode(path: Path) -> Optional[int]:
+    """Return the mode of the file at path, or None if it does not exist."""
+    try:
+        return os.stat(path).st_mode
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def is_file(path: Path) -> bool:
+    """Return true if path is a regular file, using a single stat call."""
+    mode = file_mode(path)
+    return mode is not None and stat.S_ISREG(mode)
+
+
+def walk_files(root: Path) -> Iterator[Path]:
+    """Recursively iterate over all files in root.
+
+    Like os.walk, this does not descend into symlinked directories. It uses
+    os.scandir directly so that file types come from the directory listing
+    rather than extra stat calls. Yields nothing if root does not exist.
+    """
+    # Work with strings internally, only creating Path objects for results.
+    stack = [os.fspath(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            it = os.scandir(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with it:
+            for entry in it:
+                if not entry.is_dir():
+                    yield Path(entry.path)
+                elif not entry.is_symlink():
+                    stack.append(entry.path)
+
+
 class FileSystem:
     def __init__(self, root: Path):
         self.root = root
@@ -53,8 +116,7 @@ class FileSystem:
         """
         path = Path.cwd()
         while True:
-            config = path / "zendown.yml"
-            if config.exists() and config.is_file():
+            if is_file(path / "zendown.yml"):
                 # Get the relative path to avoid showing absolute paths
                 # everywhere (e.g. in log messages). Must use os.path.relpath
                 # rather than Path.relative_to because the latter does not go up
@@ -75,10 +137,11 @@ class FileSystem:
         Logs an error and returns None if it does not exist.
         """
         path = self.root / path
-        if not path.exists():
+        mode = file_mode(path)
+        if mode is None:
             logging.error("directory %s not found", path)
             return None
-        if not path.is_dir():
+        if not stat.S_ISDIR(mode):
             logging.error("%s is not a directory", path)
             return None
         return path
@@ -89,10 +152,11 @@ class FileSystem:
         Logs an error and returns None if it does not exist.
         """
         path = self.root / path
-        if not path.exists():
+        mode = file_mode(path)
+        if mode is None:
             logging.error("file %s not found", path)
             return None
-        if not path.is_file():
+        if not stat.S_ISREG(mode):
             logging.error("%s is not a file", path)
             return None
         return path
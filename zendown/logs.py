@@ -3,7 +3,7 @@
 import logging
 import sys
 from logging import Formatter, LogRecord, StreamHandler
-from typing import Dict, NoReturn, Optional, TextIO
+from typing import Dict, NoReturn, Optional, TextIO, Tuple
 
 
 class ColorFormatter(Formatter):
@@ -29,15 +29,22 @@ class ColorFormatter(Formatter):
     def __init__(self, use_color: bool):  # pylint: disable=super-init-not-called
         self.default = Formatter(f"%(levelname)s: {self.FORMAT}")
         self.formatters: Dict[int, Formatter] = {}
+        # Escape codes to put around the level name, keyed by level.
+        self.escapes: Dict[int, Tuple[str, str]] = {}
         if use_color:
             for level in self.COLORS:
                 code = self.COLORS[level]
                 fmt = f"\x1b[{code};1m%(levelname)s:\x1b[0m {self.FORMAT}"
                 self.formatters[level] = Formatter(fmt)
+                self.escapes[level] = (f"\x1b[{code};1m", "\x1b[0m")
 
     def format(self, record: LogRecord) -> str:
-        formatter = self.formatters.get(record.levelno, self.default)
-        return formatter.format(record)
+        if record.exc_info or record.stack_info:
+            formatter = self.formatters.get(record.levelno, self.default)
+            return formatter.format(record)
+        # Fast path for plain messages, avoiding the %-style substitution.
+        start, end = self.escapes.get(record.levelno, ("", ""))
+        return f"{start}{record.levelname}:{end} {record.getMessage()}"
 
 
 class ExitStreamHandler(StreamHandler):
@@ -13,6 +13,7 @@ from typing import (
     List,
     Optional,
     Sequence,
+    Tuple,
     TypeVar,
     Union,
 )
@@ -30,6 +31,10 @@ if TYPE_CHECKING:
     from zendown.zfm import ZFMRenderer
 
 
+# Whether each token type seen so far is a subclass of BlockToken.
+_block_types: Dict[type, bool] = {}
+
+
 class Context:
 
     """Context passed to macros.
@@ -46,12 +51,32 @@ class Context:
 
     def render(self, token: Union[Token, Sequence[Token]]) -> str:
         """Render a token or a list of tokens to HTML."""
+        if isinstance(token, list):
+            return self.render_many(token)
+        return self.render_one(token)
+
+    def render_one(self, token: Token) -> str:
+        """Render a single token to HTML."""
+        assert self.renderer
+        return self.renderer.render(token)
+
+    def render_many(self, tokens: Sequence[Token]) -> str:
+        """Render a list of tokens to HTML, joined by newlines if any are blocks."""
         assert self.renderer
-        if not isinstance(token, list):
-            return self.renderer.render(token)
-        if any(isinstance(c, BlockToken) for c in token):
-            return "\n".join(self.renderer.render(c) for c in token)
-        return "".join(self.renderer.render(c) for c in token)
+        render = self.renderer.render
+        parts = []
+        has_block = False
+        for child in tokens:
+            if not has_block:
+                # Most lists contain a few token types, so look up the type in
+                # a cache rather than calling isinstance on every child.
+                cls = type(child)
+                is_block = _block_types.get(cls)
+                if is_block is None:
+                    is_block = _block_types[cls] = issubclass(cls, BlockToken)
+                has_block = is_block
+            parts.append(render(child))
+        return ("\n" if has_block else "").join(parts)
 
 
 class Kind(enum.Enum):
@@ -77,25 +102,56 @@ MacroFunction = Union[
     InlineMacroFunction, BlockMacroFunction,
 ]
 
+# Expected annotation (and its display name) for the children parameter.
+CHILDREN_TYPES = {
+    Kind.INLINE: (List[SpanToken], "List[SpanToken]"),
+    Kind.BLOCK: (List[BlockToken], "List[BlockToken]"),
+}
+
+# Function that calls a macro function given the context, arg, and block.
+Invoker = Callable[[Context, str, Optional[List[BlockToken]]], str]
+
+F = TypeVar("F", bound=MacroFunction)
 IMF = TypeVar("IMF", bound=InlineMacroFunction)
 BMF = TypeVar("BMF", bound=BlockMacroFunction)
 
 
+def register_macro(kind: Kind, f: MacroFunction):
+    """Add a macro to the _macros dict in the global scope of its function."""
+    macros = getattr(f, "__globals__").setdefault("_macros", {})
+    macros[f.__name__] = Macro(kind, f)
+
+
 def inline_macro(f: IMF) -> IMF:
     """Decorator that marks a function as an inline macro."""
-    scope = getattr(f, "__globals__")
-    if not "_macros" in scope:
-        scope["_macros"] = {}
-    scope["_macros"][f.__name__] = Macro(Kind.INLINE, f)
+    register_macro(Kind.INLINE, f)
     return f
 
 
 def block_macro(f: BMF) -> BMF:
     """Decorator that marks a function as a block macro."""
-    scope = getattr(f, "__globals__")
-    if not "_macros" in scope:
-        scope["_macros"] = {}
-    scope["_macros"][f.__name__] = Macro(Kind.BLOCK, f)
+    register_macro(Kind.BLOCK, f)
+    return f
+
+
+def pure(f: F) -> F:
+    """Decorator that marks a macro function as pure.
+
+    A pure macro's output depends only on its arg, the builder, and the render
+    options, so Zendown can reuse the output of previous calls with the same
+    arg. It has no effect on macros called with a blockquote. It can be applied
+    above or below @inline_macro or @block_macro.
+
+    A pure macro must not render tokens taken from its arg (e.g. children for
+    inline macros). They can contain other macros, whose output may depend on
+    the article, and errors in them would only be reported on the first call.
+    """
+    setattr(f, "zfm_pure", True)
+    # If @inline_macro or @block_macro was applied first, update its Macro.
+    macros = getattr(f, "__globals__", {}).get("_macros", {})
+    macro = macros.get(getattr(f, "__name__", None))
+    if macro and macro.function is f:
+        macro.pure = True
     return f
 
 
@@ -133,50 +189,135 @@ class Macro:
 
     The function must return a string of rendered HTML. The ctx.render function
     is helpful for this.
+
+    If the function is marked with @pure, results for calls without a
+    blockquote are cached by arg, builder, and render options.
     """
 
     def __init__(self, kind: Kind, function: MacroFunction):
         self.kind = kind
         self.name = function.__name__
         self.function: Callable[..., str] = function
-        parameters = inspect.signature(function).parameters
+        # Read the parameters from the code object rather than using
+        # inspect.signature, which is much slower. Follow __wrapped__ like
+        # inspect.signature does, so that decorated macros work.
+        unwrapped = inspect.unwrap(function)
+        code = getattr(unwrapped, "__code__", None)
+        parameters: Sequence[str]
+        annotations: Dict[str, Any]
+        if code is not None:
+            parameters = code.co_varnames[: code.co_argcount + code.co_kwonlyargcount]
+            annotations = getattr(unwrapped, "__annotations__", {})
+        else:
+            # Partials and other callable objects have no code object.
+            signature = inspect.signature(function).parameters
+            parameters = tuple(signature)
+            annotations = {
+                name: param.annotation
+                for name, param in signature.items()
+                if param.annotation is not param.empty
+            }
         self.requires_arg = "arg" in parameters
         self.requires_children = "children" in parameters
         if self.requires_arg:
-            ann = parameters["arg"].annotation
+            ann = annotations.get("arg")
             if ann and ann is not str:
                 logging.error("%s: macro arg should be str, not %s", self.name, ann)
         if self.requires_children:
-            ann = parameters["children"].annotation
-            if kind is Kind.INLINE and ann and ann is not List[SpanToken]:
-                logging.error("%s: expected List[SpanToken], not %s", self.name, ann)
-            if kind is Kind.BLOCK and ann and ann is not List[BlockToken]:
-                logging.error("%s: expected List[BlockToken], not %s", self.name, ann)
+            ann = annotations.get("children")
+            expected, expected_name = CHILDREN_TYPES[kind]
+            if ann and ann is not expected:
+                logging.error("%s: expected %s, not %s", self.name, expected_name, ann)
         if kind is Kind.INLINE and self.requires_arg and self.requires_children:
             logging.error("%s: inline macros take arg OR children", self.name)
+        self.pure = getattr(function, "zfm_pure", False)
+        self.cache: Dict[Tuple[Any, ...], str] = {}
+        self.invoke = self.specialize()
+
+    # Maximum number of entries in the cache for pure macros.
+    MAX_CACHE_SIZE = 256
 
     def __call__(
         self, ctx: Context, arg: str, block: Optional[List[BlockToken]]
     ) -> str:
-        arguments: Dict[str, Any] = {"ctx": ctx}
-        children: Optional[List[Token]] = block
-        if self.kind is Kind.INLINE and self.requires_children:
+        if not self.pure or block is not None:
+            return self.invoke(ctx, arg, block)
+        assert ctx.renderer
+        key = (ctx.builder.name, ctx.renderer.options, arg)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.invoke(ctx, arg, block)
+            if len(self.cache) >= self.MAX_CACHE_SIZE:
+                self.cache.clear()
+            self.cache[key] = result
+        return result
+
+    def specialize(self) -> Invoker:
+        """Return a function that calls the macro function with an arg and block.
+
+        The returned function only passes the arguments the macro function takes
+        and only performs the checks that apply to it, so that calls do not need
+        to branch on the signature or build a dict of keyword arguments.
+        """
+        f = self.function
+
+        def inline_children(ctx: Context, arg: str, _: Any) -> str:
             # Note: macros are executed in a rendering context, so
             # tokenize_inner will have access to all the extra tokens.
-            children = tokenize_inner(arg)
-            arg = ""
+            return f(ctx=ctx, children=tokenize_inner(arg))
+
+        def inline_arg_children(ctx: Context, arg: str, _: Any) -> str:
+            # Inline macros should not take both. Pass an empty arg.
+            return f(ctx=ctx, arg="", children=tokenize_inner(arg))
+
+        def arg_only(ctx: Context, arg: str, block: Optional[List[BlockToken]]) -> str:
+            check_no_block(block)
+            return f(ctx=ctx, arg=arg)
+
+        def children_only(
+            ctx: Context, arg: str, block: Optional[List[BlockToken]]
+        ) -> str:
+            check_no_arg(arg)
+            return f(ctx=ctx, children=check_block(block))
+
+        def arg_children(
+            ctx: Context, arg: str, block: Optional[List[BlockToken]]
+        ) -> str:
+            return f(ctx=ctx, arg=arg, children=check_block(block))
+
+        def no_args(ctx: Context, arg: str, block: Optional[List[BlockToken]]) -> str:
+            check_no_arg(arg)
+            check_no_block(block)
+            return f(ctx=ctx)
+
+        if self.kind is Kind.INLINE and self.requires_children:
+            if self.requires_arg:
+                return inline_arg_children
+            return inline_children
+        # Inline macros always get block=None, so the block checks are no-ops.
+        if self.requires_arg and self.requires_children:
+            return arg_children
         if self.requires_arg:
-            arguments["arg"] = arg
-        elif arg:
-            raise MacroError(f"unexpected argument {arg!r}")
+            return arg_only
         if self.requires_children:
-            if children is None:
-                # This can only happen for block macros. For inline macros, we'd
-                # at least tokenize "" which becomes [].
-                assert self.kind is Kind.BLOCK
-                raise MacroError("macro needs a blockquote")
-            arguments["children"] = children
-        elif children:
-            assert self.kind is Kind.BLOCK
-            raise MacroError("macro does not take blockquote")
-        return self.function(**arguments)
+            return children_only
+        return no_args
+
+
+def check_no_arg(arg: Optional[str]):
+    """Raise a MacroError if arg is present."""
+    if arg:
+        raise MacroError(f"unexpected argument {arg!r}")
+
+
+def check_no_block(block: Optional[List[BlockToken]]):
+    """Raise a MacroError if block is nonempty."""
+    if block:
+        raise MacroError("macro does not take blockquote")
+
+
+def check_block(block: Optional[List[BlockToken]]) -> List[BlockToken]:
+    """Raise a MacroError if block is missing. Otherwise, return it."""
+    if block is None:
+        raise MacroError("macro needs a blockquote")
+    return block
@@ -2,33 +2,56 @@
 
 from __future__ import annotations
 
-import importlib.util
 import logging
 import os
+import re
+import stat
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Iterable, Iterator, List, Optional, TypeVar
+from types import MappingProxyType
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 from zendown.article import Article
 from zendown.config import Config
-from zendown.files import FileSystem
+from zendown.files import FileSystem, walk_files
 from zendown.logs import fatal
 from zendown.macro import Macro
 from zendown.resource import Asset, Include, Resource
 from zendown.tree import Label, Ref, Tree
 
+# File extensions of articles in the content directory.
+ARTICLE_EXTENSIONS = (".md", ".yml")
+
+# Cache for Project.load_macros, mapping paths to (mtime, size) and macros.
+_macros_cache: Dict[Path, Tuple[Tuple[int, int], Optional[Dict[str, Macro]]]] = {}
+
 
 class ProjectConfig(Config):
 
-    required = {
-        "project_name": "Unnamed Project",
-    }
+    required = MappingProxyType({"project_name": "Unnamed Project"})
 
-    optional = {
-        "inline_code_macro": None,
-        "smart_typography": False,
-        "image_links": False,
-        "image_title_from_alt": False,
-    }
+    optional = MappingProxyType(
+        {
+            "inline_code_macro": None,
+            "smart_typography": False,
+            "image_links": False,
+            "image_title_from_alt": False,
+            # Directories in content/ to skip, besides hidden ones.
+            "scan_ignore": ["__pycache__", "node_modules"],
+        }
+    )
 
 
 T = TypeVar("T", bound=Resource)
@@ -65,8 +88,15 @@ class Project:
         self.includes: Tree[Include] = Tree()
         self.articles: Tree[Article] = Tree()
         self._inverse_links: Optional[Dict[Article, List[Article]]] = None
+        self._query_results: Dict[str, Tuple[Article, ...]] = {}
+        # Lowercased article refs joined by NUL, for case-insensitive queries.
+        # The ref for self._ref_articles[i] starts at self._ref_starts[i].
+        self._ref_corpus = ""
+        self._ref_starts: List[int] = []
+        self._ref_articles: List[Article] = []
         self.load_macros()
         self.scan_articles()
+        self.scan_resources()
 
     def __repr__(self) -> str:
         return f"Project(name={self.name!r}, path={self.fs.root!r})"
@@ -87,12 +117,26 @@ class Project:
     def load_macros(self):
         """Load the project's macros.py file, if it exists."""
         f = self.fs.join("macros.py")
-        if f.exists() and f.is_file():
-            logging.info("loading macros file %s", f)
-            spec = importlib.util.spec_from_file_location("macros", f)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)  # type: ignore
-            self.macros = getattr(module, "_macros", None)
+        try:
+            st = os.stat(f)
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        if not stat.S_ISREG(st.st_mode):
+            return
+        version = (st.st_mtime_ns, st.st_size)
+        cached = _macros_cache.get(f)
+        if cached and cached[0] == version:
+            self.macros = cached[1]
+            return
+        logging.info("loading macros file %s", f)
+        # Imported here since most projects do not have a macros file.
+        import importlib.util  # pylint: disable=import-outside-toplevel
+
+        spec = importlib.util.spec_from_file_location("macros", f)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)  # type: ignore
+        self.macros = getattr(module, "_macros", None)
+        _macros_cache[f] = (version, self.macros)
 
     def get_macro(self, name: str) -> Optional[Macro]:
         """Get the macro with the given name."""
@@ -128,27 +172,104 @@ class Project:
         logging.debug("found include file at %s", path)
         return self.includes.create(ref, Include, path)
 
+    def scan_resources(self):
+        """Locate all the assets and include files in the project.
+
+        This populates the trees up front so that get_asset and get_include
+        usually find resources with a dict lookup rather than a stat call. They
+        still fall back to checking the file system on a miss.
+        """
+        self.assets = Tree()
+        self.includes = Tree()
+        # Slice the walked paths as strings rather than using Path.relative_to.
+        assets_dir = self.fs.join("assets")
+        start = len(os.fspath(assets_dir)) + 1
+        for path in walk_files(assets_dir):
+            relative = os.fspath(path)[start:]
+            ref: Ref[Asset] = Ref(tuple(Label(p) for p in relative.split(os.sep)))
+            self.assets.create(ref, Asset, path)
+        includes_dir = self.fs.join("includes")
+        start = len(os.fspath(includes_dir)) + 1
+        for path in walk_files(includes_dir):
+            relative = os.fspath(path)[start:]
+            if not relative.endswith(".md") or path.name == ".md":
+                continue
+            parts = relative[:-3].split(os.sep)
+            include_ref: Ref[Include] = Ref(tuple(Label(p) for p in parts))
+            self.includes.create(include_ref, Include, path)
+
     def scan_articles(self):
         """Locate all the articles in the project and populate the tree."""
         content_dir = self.fs.dir("content")
         if not content_dir:
             return
         self.articles = Tree()
-        for path_str, _, files in os.walk(content_dir):
-            path = Path(path_str)
-            for name in files:
-                file_path = path / name
-                if file_path.suffix not in (".md", ".yml"):
+        self._query_results.clear()
+        self._ref_articles = []
+        ignore = frozenset(self.cfg["scan_ignore"])
+        self._scan_dir(os.fspath(content_dir), (), ignore)
+        lower_refs = [str(a.node.ref).lower() for a in self._ref_articles]
+        self._ref_corpus = "\0".join(lower_refs)
+        self._ref_starts = []
+        start = 0
+        for lower_ref in lower_refs:
+            self._ref_starts.append(start)
+            start += len(lower_ref) + 1
+
+    def _scan_dir(
+        self,
+        directory: str,
+        parts: Tuple[Label[Article], ...],
+        ignore: FrozenSet[str],
+    ):
+        # Like os.walk, this visits files before subdirectories and does not
+        # descend into symlinked directories. Using os.scandir directly lets us
+        # build refs from the labels so far instead of from a relative Path.
+        # Hidden and ignored directories (e.g. .git) are skipped entirely.
+        subdirs = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_dir():
+                    name = entry.name
+                    if not (
+                        entry.is_symlink() or name.startswith(".") or name in ignore
+                    ):
+                        subdirs.append(entry)
+                    continue
+                name = entry.name
+                if not name.endswith(ARTICLE_EXTENSIONS):
+                    continue
+                # Like Path.suffix, a leading dot does not start an extension.
+                dot = name.rfind(".")
+                if dot == 0:
                     continue
-                relative = file_path.relative_to(content_dir).with_suffix("")
-                ref: Ref[Article] = Ref(tuple(Label(p) for p in relative.parts))
-                self.articles.create(ref, Article, file_path)
-                logging.debug("found article at %s", file_path)
+                ref: Ref[Article] = Ref(parts + (Label(name[:dot]),))
+                article = self.articles.create(ref, Article, Path(entry.path))
+                self._ref_articles.append(article)
+                logging.debug("found article at %s", entry.path)
+        for entry in subdirs:
+            self._scan_dir(entry.path, parts + (Label(entry.name),), ignore)
 
     def all_articles(self) -> Iterable[Article]:
         """Iterate over all articles in the project."""
         return self.articles.by_ref.values()
 
+    def load_articles(self):
+        """Load all articles that are not already loaded.
+
+        Files are read and their configs parsed on a thread pool, since this is
+        mostly waiting on disk. Parsing Markdown is not done here because
+        mistletoe keeps its token types in global state.
+        """
+        articles = [a for a in self.articles if not a.is_loaded()]
+        if len(articles) <= 1:
+            for article in articles:
+                article.load()
+            return
+        with ThreadPoolExecutor() as executor:
+            # Consume the results so that exceptions (and fatal exits) propagate.
+            list(executor.map(Article.load, articles))
+
     def all_resources(self) -> Iterator[Resource]:
         """Iterate over all resources in the project."""
         yield from self.articles.by_ref.values()
@@ -159,35 +280,96 @@ class Project:
         """Unload all resources in the project."""
         for resource in self.all_resources():
             resource.unload()
+        self._query_results.clear()
 
     def query(self, substr: str) -> Iterator[Article]:
         """Iterate over articles whose refs have the given substring.
 
-        If the query starts with "@", instead yields articles that have the
-        given that value (excluding "@") in their "tags" config.
+        Matching is case-insensitive. If the query starts with "@", instead
+        yields articles that have the given that value (excluding "@") in their
+        "tags" config. The query "@" alone matches all articles with any tags,
+        and the empty query matches all articles.
+
+        Articles are yielded as they are found. Once the iterator is exhausted,
+        the results are cached until the articles are rescanned or unloaded.
         """
+        if not substr:
+            yield from self.all_articles()
+            return
+        results = self._query_results.get(substr)
+        if results is not None:
+            yield from results
+            return
+        matches = []
+        for article in self._query(substr):
+            matches.append(article)
+            yield article
+        self._query_results[substr] = tuple(matches)
+
+    def _query(self, substr: str) -> Iterator[Article]:
         if substr.startswith("@"):
             tag = substr[1:]
             for article in self.articles:
-                article.ensure_loaded()
-                assert article.cfg
-                if tag in article.cfg["tags"]:
+                tags = article.tags
+                if tag in tags or (not tag and tags):
                     ref = article.node.ref
                     logging.debug("query %r matched article %s", substr, ref)
                     yield article
         else:
-            for ref, article in self.articles.by_ref.items():
-                if substr in str(ref):
-                    logging.debug("query %r matched article %s", substr, ref)
-                    yield article
+            lower = substr.lower()
+            corpus = self._ref_corpus
+            for article in self._match_refs(lambda pos: corpus.find(lower, pos)):
+                logging.debug("query %r matched article %s", substr, article.node.ref)
+                yield article
+
+    def _match_refs(self, find: Callable[[int], int]) -> Iterator[Article]:
+        """Iterate over articles whose lowercased refs contain a match.
+
+        The find function should return the offset of the first match in the ref
+        corpus at or after the given offset, or -1 if there is none. Searching
+        the whole corpus this way stays in C rather than looping over refs.
+        """
+        starts = self._ref_starts
+        if not starts:
+            return
+        pos = find(0)
+        while pos != -1:
+            i = bisect_right(starts, pos) - 1
+            yield self._ref_articles[i]
+            if i + 1 == len(starts):
+                return
+            pos = find(starts[i + 1])
 
     def queries(self, substrs: Iterable[str]) -> Iterator[Article]:
-        """Iterate over Project.query(s) for each s in substrs."""
+        """Iterate over Project.query(s) for each s in substrs.
+
+        Each matching article is yielded once, even if several queries match
+        it. If there are multiple queries and none of them are tag queries,
+        matches all of them in a single pass, yielding articles in project
+        order. Otherwise, yields them in the order the queries find them.
+        """
+        substrs = list(substrs)
         if not substrs:
             yield from self.all_articles()
+        elif len(substrs) > 1 and not any(s.startswith("@") for s in substrs):
+            pattern = re.compile("|".join(re.escape(s.lower()) for s in substrs))
+
+            def find(pos: int) -> int:
+                match = pattern.search(self._ref_corpus, pos)
+                return match.start() if match else -1
+
+            for article in self._match_refs(find):
+                logging.debug(
+                    "queries %r matched article %s", substrs, article.node.ref
+                )
+                yield article
         else:
+            seen: Set[Article] = set()
             for s in substrs:
-                yield from self.query(s)
+                for article in self.query(s):
+                    if article not in seen:
+                        seen.add(article)
+                        yield article
 
     @property
     def inverse_links(self) -> Dict[Article, List[Article]]:
@@ -196,14 +378,13 @@ class Project:
         This causes all articles to be loaded, parsed, and resolved.
         """
         if self._inverse_links is None:
-            self._inverse_links = {}
-            for article in self.articles:
-                self._inverse_links[article] = []
+            self.load_articles()
+            inverse: Dict[Article, List[Article]] = {a: [] for a in self.articles}
             for source in self.articles:
                 source.ensure_resolved(self)
                 for link in source.links:
                     dest = link.article
-                    if dest is source:
-                        continue
-                    self._inverse_links[dest].append(source)
+                    if dest is not source:
+                        inverse[dest].append(source)
+            self._inverse_links = inverse
         return self._inverse_links
@@ -3,9 +3,8 @@
 from __future__ import annotations
 
 import logging
+import os
 from abc import ABC
-from contextlib import contextmanager
-from io import StringIO
 from pathlib import Path
 from typing import TYPE_CHECKING, Optional
 
@@ -34,6 +33,8 @@ class Resource(ABC):
     not been loaded yet.
     """
 
+    __slots__ = ("path", "node")
+
     # Tried using self: T` and node: Node[T] with TypeVar("T", bound="Resource")
     # but ran into issues. Also tried Node[Resource] but had trouble making Node
     # covariant. Decided to declare it Node and refine the type in subclasses.
@@ -47,14 +48,25 @@ class Resource(ABC):
     def kind(self) -> str:
         return self.__class__.__name__
 
-    @contextmanager
-    def open_file(self):
+    def read_file(self) -> str:
+        """Read the resource's file as UTF-8 text with universal newlines.
+
+        Resource files are small, so this reads them with a single os.read and
+        decodes once, avoiding the overhead of Python file objects.
+        """
         try:
-            with open(self.path) as f:
-                yield f
+            fd = os.open(self.path, os.O_RDONLY)
         except FileNotFoundError:
             logging.error("%s: file disappeared", self.path)
-            yield StringIO("")
+            return ""
+        try:
+            data = os.read(fd, os.fstat(fd).st_size)
+        finally:
+            os.close(fd)
+        text = data.decode("utf-8")
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
 
     def is_loaded(self) -> bool:
         """Return true if the resource has been loaded."""
@@ -68,7 +80,10 @@ class Resource(ABC):
     def load(self):
         """Load the resource from disk."""
         logging.info("loading %s %s from %s", self.kind(), self.node.ref, self.path)
-        self.unload()
+        # Only tear down earlier state when reloading. A resource cannot be
+        # parsed or resolved without being loaded, so there is none otherwise.
+        if self.is_loaded():
+            self.unload()
         self._load()
 
     def unload(self):
@@ -99,7 +114,6 @@ class Resource(ABC):
         assert self.is_loaded()
         if self.is_parsed():
             return
-        self.unparse()
         logging.info("parsing %s %s", self.kind(), self.node.ref)
         self._parse()
 
@@ -133,7 +147,6 @@ class Resource(ABC):
         logging.info(
             "resolving %s %s in project %s", self.kind(), self.node.ref, project.name
         )
-        self.unresolve()
         self._resolve(project)
 
     def unresolve(self):
@@ -156,6 +169,8 @@ class Asset(Resource):
     build (e.g., adding borders).
     """
 
+    __slots__ = ()
+
     node: Node[Asset]
 
 
@@ -163,6 +178,8 @@ class Include(Resource):
 
     """A file to be included in articles."""
 
+    __slots__ = ("raw", "_doc")
+
     node: Node[Include]
 
     def __init__(self, path: Path, node: Node[Include]):
@@ -177,8 +194,7 @@ class Include(Resource):
         self.raw = None
 
     def _load(self):
-        with self.open_file() as f:
-            self.raw = f.read()
+        self.raw = self.read_file()
 
     def is_parsed(self) -> bool:
         return self._doc is not None
@@ -0,0 +1,7 @@
+"""Names of build targets.
+
+These are kept separate from zendown.build, which is slow to import, so that
+the command-line interface can list and validate them cheaply.
+"""
+
+BUILDER_NAMES = ("html", "hubspot", "latex")
@@ -10,55 +10,62 @@ Token = Union[SpanToken, BlockToken]
 
 
 def walk(tokens: Union[Token, Sequence[Token]], f: Callable[[Token], None]):
-    """Recursively call f on tokens and all descendants."""
+    """Call f on tokens and all descendants, in pre-order."""
+    stack = list(reversed(tokens)) if isinstance(tokens, list) else [tokens]
+    while stack:
+        token = stack.pop()
+        f(token)
+        children = getattr(token, "children", None)
+        if children is not None:
+            stack.extend(reversed(children))
 
-    def go(t: Token):
-        f(t)
-        if hasattr(t, "children"):
-            for child in t.children:
-                go(child)
 
-    if isinstance(tokens, list):
-        for token in tokens:
-            go(token)
-    else:
-        go(tokens)
+# Token types that can hold HTML comments.
+HTML_TYPES = (HTMLBlock, HTMLSpan)
 
 
-def strip_comments(token: Token):
-    """Remove all HTML comment tokens."""
+def is_comment(t: Token) -> bool:
+    """Return true if t is an HTML comment token."""
+    return isinstance(t, HTML_TYPES) and t.content.startswith("<!--")
 
-    def is_comment(t: Token) -> bool:
-        return isinstance(t, (HTMLBlock, HTMLSpan)) and t.content.startswith("<!--")
 
-    def go(t: Token):
-        if hasattr(t, "children"):
-            t.children = [child for child in t.children if not is_comment(child)]
-
-    walk(token, go)
+def strip_comments(token: Token):
+    """Remove all HTML comment tokens."""
+    # Filter and traverse in the same loop. Order does not matter here.
+    stack = [token]
+    while stack:
+        t = stack.pop()
+        children = getattr(t, "children", None)
+        if children is not None:
+            t.children = [child for child in children if not is_comment(child)]
+            stack.extend(t.children)
 
 
 def transform_text(tokens: Sequence[Token], f: Callable[[str], str]):
     """Transform tokens by applying f to all raw text."""
-
-    def go(t: Token):
-        if isinstance(t, RawText):
+    # RawText tokens are always leaves, and RawText is never subclassed. Order
+    # does not matter here.
+    stack = list(tokens)
+    while stack:
+        t = stack.pop()
+        if type(t) is RawText:  # pylint: disable=unidiomatic-typecheck
             t.content = f(t.content)
-
-    walk(tokens, go)
+            continue
+        children = getattr(t, "children", None)
+        if children is not None:
+            stack.extend(children)
 
 
 def collect_text(token: Token) -> str:
     """Return all raw text in token concatenated together."""
-    text = ""
+    parts: List[str] = []
 
     def go(token: Token):
-        if isinstance(token, RawText):
-            nonlocal text
-            text += token.content
+        if type(token) is RawText:  # pylint: disable=unidiomatic-typecheck
+            parts.append(token.content)
 
     walk(token, go)
-    return text
+    return "".join(parts)
 
 
 def raw_text(text: str) -> RawText:
@@ -3,12 +3,14 @@
 from __future__ import annotations
 
 import sys
+from types import MappingProxyType
 from typing import (
     Any,
     Callable,
     Dict,
     Generic,
     Iterator,
+    Mapping,
     Optional,
     TextIO,
     Tuple,
@@ -24,8 +26,12 @@ class Label(Generic[T]):
 
     """A label for a node in a tree."""
 
+    __slots__ = ("val", "_hash")
+
     def __init__(self, val: str):
-        self.val = val
+        # Interned so that equal labels always have the identical string.
+        self.val = sys.intern(val)
+        self._hash = hash(self.val)
 
     def __repr__(self) -> str:
         return self.val
@@ -33,14 +39,17 @@ class Label(Generic[T]):
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Label):
             return NotImplemented
-        return self.val == other.val
+        return self.val is other.val
 
     def __hash__(self) -> int:
-        return hash(self.val)
+        return self._hash
 
 
 ROOT: Label[Any] = Label("$root")
 
+# Children of all leaf nodes. Shared so that leaves do not each allocate a dict.
+NO_CHILDREN: Mapping[Any, Any] = MappingProxyType({})
+
 
 class Ref(Generic[T]):
 
@@ -49,18 +58,31 @@ class Ref(Generic[T]):
     The ref does not include the special root label.
     """
 
+    __slots__ = ("parts", "_hash", "_str")
+
     def __init__(self, parts: Tuple[Label[T], ...]):
         self.parts = parts
+        self._hash = hash(parts)
+        self._str: Optional[str] = None
 
     @staticmethod
     def parse(s: str, leading_slash: bool = True) -> Ref[T]:
-        if leading_slash:
-            assert len(s) >= 1 and s[0] == "/"
-            s = s[1:]
-        return Ref(tuple(Label(p) for p in s.split("/")))
+        key = (s, leading_slash)
+        ref = _parse_cache.get(key)
+        if ref is None:
+            if leading_slash:
+                assert len(s) >= 1 and s[0] == "/"
+                s = s[1:]
+            ref = Ref(tuple(Label(p) for p in s.split("/")))
+            if len(_parse_cache) >= PARSE_CACHE_SIZE:
+                _parse_cache.clear()
+            _parse_cache[key] = ref
+        return ref
 
     def __repr__(self) -> str:
-        return "/" + "/".join(str(label) for label in self.parts)
+        if self._str is None:
+            self._str = "/" + "/".join(label.val for label in self.parts)
+        return self._str
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Ref):
@@ -68,7 +90,15 @@ class Ref(Generic[T]):
         return self.parts == other.parts
 
     def __hash__(self) -> int:
-        return hash(self.parts)
+        return self._hash
+
+
+# Cache for Ref.parse, since links to the same ref are parsed many times. Refs
+# are immutable, so callers can share them.
+_parse_cache: Dict[Tuple[str, bool], Ref[Any]] = {}
+
+# Maximum number of entries in the Ref.parse cache.
+PARSE_CACHE_SIZE = 4096
 
 
 class Collision:
@@ -86,12 +116,14 @@ class Node(Generic[T]):
     can have any number of children.
     """
 
+    __slots__ = ("label", "ref", "parent", "item", "children")
+
     def __init__(self, label: Label[T], ref: Ref[T], parent: Optional[Node[T]]):
         self.label = label
         self.ref = ref
         self.parent = parent
         self.item: Optional[T] = None
-        self.children: Dict[Label[T], Node[T]] = {}
+        self.children: Mapping[Label[T], Node[T]] = NO_CHILDREN
 
     def __repr__(self) -> str:
         return f"Node(label={self.label!r}, ref={self.ref!r}, item={self.item!r})"
@@ -112,7 +144,9 @@ class Node(Generic[T]):
     def add_child(self, label: Label[T]) -> Node[T]:
         """Add a child with the given label."""
         child = Node(label, Ref(self.ref.parts + (label,)), self)
-        self.children[label] = child
+        if self.children is NO_CHILDREN:
+            self.children = {}
+        cast(Dict[Label[T], Node[T]], self.children)[label] = child
         return child
 
 
@@ -120,6 +154,8 @@ class Tree(Generic[T]):
 
     """A tree of nodes associated with items of type T."""
 
+    __slots__ = ("root", "by_ref", "by_label")
+
     def __init__(self):
         self.root = Node.root()
         self.by_ref: Dict[Ref[T], T] = {}
@@ -131,17 +167,18 @@ class Tree(Generic[T]):
 
     def dump(self, out: TextIO = sys.stdout):
         """Dump a textual representation of the tree to out."""
-
-        def go(node: Node[T], indent: int):
+        lines = []
+        stack = [(self.root, 0)]
+        while stack:
+            node, indent = stack.pop()
             space = "    " * indent
             item = ""
             if node.item is not None:
                 item = f" = {node.item!r}"
-            print(f"{space}{node.label}{item}", file=out)
-            for child in node.children.values():
-                go(child, indent + 1)
-
-        go(self.root, 0)
+            lines.append(f"{space}{node.label}{item}\n")
+            children = list(node.children.values())
+            stack.extend((child, indent + 1) for child in reversed(children))
+        out.write("".join(lines))
 
     def create(self, ref: Ref[T], make_item: Callable[..., T], *args, **kwargs) -> T:
         """Create a new node and item.
@@ -152,10 +189,8 @@ class Tree(Generic[T]):
         """
         node = self.root
         for label in ref.parts:
-            if label in node.children:
-                node = node.children[label]
-            else:
-                node = node.add_child(label)
+            child = node.children.get(label)
+            node = child if child is not None else node.add_child(label)
         item = make_item(*args, **kwargs, node=node)
         self.register(node, item)
         return item
@@ -169,10 +204,8 @@ class Tree(Generic[T]):
         node.set_item(item)
         self.by_ref[node.ref] = item
         label = node.ref.parts[-1]
-        if label in self.by_label:
+        if self.by_label.setdefault(label, item) is not item:
             self.by_label[label] = COLLISION
-        else:
-            self.by_label[label] = item
 
     @property
     def by_unique_label(self) -> Dict[Label[T], T]:
@@ -3,10 +3,10 @@
 from __future__ import annotations
 
 import logging
+import os
 import webbrowser
-from pathlib import Path
-from threading import Thread
-from typing import Optional
+from threading import Lock, Thread, Timer
+from typing import Any, List, Optional, Set, Tuple
 
 import livereload
 from livereload.handlers import LiveReloadHandler
@@ -15,13 +15,20 @@ from tornado.websocket import WebSocketError
 from watchdog.events import FileModifiedEvent, FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
 
+from zendown.article import Anchor, Article, Index
 from zendown.build import Builder
-from zendown.project import Project
+from zendown.project import ARTICLE_EXTENSIONS, Project
+from zendown.tree import Label, Ref
 
 
 class Watcher:
 
-    """Watch files for changes and rebuild using a given builder."""
+    """Watch files for changes and rebuild using a given builder.
+
+    The project and builder are created once by the caller and reused for every
+    rebuild. Rebuilds only unload the project's resources; they do not find the
+    project, reload its configuration, or construct a new builder.
+    """
 
     def __init__(self, project: Project, builder: Builder, server: Optional[Server]):
         self.fs = project.fs
@@ -63,39 +70,130 @@ class Handler(FileSystemEventHandler):
 
     """Handler for file system events on project files."""
 
+    # Seconds to wait for more events before rebuilding. Editors often emit
+    # several events for one save (temp file, rename, chmod, modify).
+    DEBOUNCE_SECONDS = 0.1
+
     def __init__(self, project: Project, builder: Builder, server: Optional[Server]):
         super().__init__()
         self.project = project
         self.builder = builder
         self.server = server
+        # The lock guards the timer and the pending flags below.
+        self.lock = Lock()
+        self.build_lock = Lock()
+        self.timer: Optional[Timer] = None
+        self.pending_macros = False
+        self.pending_scan = False
+        # Set when a change requires rebuilding every article.
+        self.pending_all = False
+        # Articles whose files were modified, which may be rebuilt on their own.
+        self.pending_articles: Set[Article] = set()
+        # Absolute project root, for stripping from event paths.
+        root = os.path.normpath(os.path.join(os.getcwd(), project.fs.root))
+        self.prefix = os.path.join(root, "")
+
+    # Project files and directories whose changes trigger a rebuild.
+    FILES = frozenset(("macros.py", "zendown.yml"))
+    PREFIXES = ("content/", "assets/", "includes/")
+    # Editor backup, swap, and probe files that should not trigger a rebuild.
+    IGNORE_SUFFIXES = ("~", ".swp", ".swx", "/4913")
 
-    def matches(self, path: Path) -> bool:
-        s = str(path)
-        return (
-            s == "macros.py"
-            or s == "zendown.yml"
-            or s.startswith("content/")
-            or s.startswith("assets/")
-            or s.startswith("includes/")
+    def matches(self, path: str) -> bool:
+        if path in self.FILES:
+            return True
+        return path.startswith(self.PREFIXES) and not path.endswith(
+            self.IGNORE_SUFFIXES
         )
 
     def on_any_event(self, event: FileSystemEvent):
-        path = Path(event.src_path).relative_to(Path.cwd()).relative_to(self.project.fs.root)
+        src = event.src_path
+        if not src.startswith(self.prefix):
+            return
+        path = src[len(self.prefix) :]
         if not self.matches(path):
             return
-        if isinstance(event, FileModifiedEvent):
-            if path == Path("macros.py"):
-                logging.info(
-                    "%s %s: reload macros + build", event.src_path, event.event_type
-                )
+        with self.lock:
+            if isinstance(event, FileModifiedEvent):
+                if path == "macros.py":
+                    logging.info(
+                        "%s %s: reload macros + build", event.src_path, event.event_type
+                    )
+                    self.pending_macros = True
+                logging.info("%s %s: build", event.src_path, event.event_type)
+                article = self.article_for(path)
+                if article:
+                    self.pending_articles.add(article)
+                else:
+                    self.pending_all = True
+            else:
+                logging.info("%s %s: scan + build", event.src_path, event.event_type)
+                self.pending_scan = True
+            if self.timer:
+                self.timer.cancel()
+            self.timer = Timer(self.DEBOUNCE_SECONDS, self.rebuild)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def article_for(self, path: str) -> Optional[Article]:
+        """Return the article for a path relative to the project root, if any."""
+        if not path.startswith("content/") or not path.endswith(ARTICLE_EXTENSIONS):
+            return None
+        stem = path[len("content/") : path.rfind(".")]
+        ref: Ref[Article] = Ref(tuple(Label(part) for part in stem.split("/")))
+        return self.project.articles.by_ref.get(ref)
+
+    def rebuild(self):
+        """Rebuild once for all the events received since the last rebuild."""
+        with self.build_lock:
+            with self.lock:
+                load_macros, scan = self.pending_macros, self.pending_scan
+                everything, articles = self.pending_all, self.pending_articles
+                self.pending_macros = self.pending_scan = self.pending_all = False
+                self.pending_articles = set()
+            if not (load_macros or scan or everything) and self.rebuild_only(articles):
+                self.reload()
+                return
+            if load_macros:
                 self.project.load_macros()
-            logging.info("%s %s: build", event.src_path, event.event_type)
-        else:
-            logging.info("%s %s: scan + build", event.src_path, event.event_type)
-            self.project.scan_articles()
-        self.project.unload_all()
-        self.build_all()
-        self.reload()
+            if scan:
+                self.project.scan_articles()
+                self.project.scan_resources()
+            self.project.unload_all()
+            self.build_all()
+            self.reload()
+
+    def rebuild_only(self, articles: Set[Article]) -> bool:
+        """Rebuild only the given modified articles, if that is enough.
+
+        Other pages depend on an article's configuration (title, tags, etc.)
+        and its section anchors. If any of those changed, returns False without
+        building so that the caller rebuilds everything.
+        """
+        if not articles:
+            return False
+
+        def outline(article: Article) -> Tuple[Any, List[Anchor]]:
+            return article.cfg and article.cfg.data, list(article.anchors)
+
+        for article in articles:
+            if article.is_index() or not article.is_parsed():
+                return False
+            before = outline(article)
+            article.load()
+            if outline(article) != before:
+                return False
+        # Index pages for ancestors get rewritten, and rendering mutates tokens,
+        # so unload their index articles to render them afresh.
+        for article in articles:
+            node = article.node.parent
+            while node:
+                index = Index(node).article
+                if index:
+                    index.unload()
+                node = node.parent
+        self.builder.build(articles)
+        return True
 
     def build_all(self):
         self.builder.build(self.project.all_articles())
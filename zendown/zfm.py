@@ -4,7 +4,10 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import TYPE_CHECKING, List, NamedTuple, Optional
+import string
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Match, NamedTuple, Optional
 
 from mistletoe import block_token, span_token
 from mistletoe.block_token import BlockToken, Document, Heading, HTMLBlock, Quote
@@ -42,23 +45,51 @@ def parse_document(raw: str) -> Document:
     """Parse a ZFM document."""
     set_zfm_tokens()
     doc = Document(raw)
-    strip_comments(doc)
+    # Avoid walking the whole tree when there can't be any comments.
+    if "<!--" in raw:
+        strip_comments(doc)
     return doc
 
 
+# Sequences that smartify replaces.
+SMART_PATTERN = re.compile(r"\"|'|\.\.\.|--")
+
+# Characters that any sequence in SMART_PATTERN starts with.
+SMART_TRIGGERS = frozenset("\"'.-")
+
+# Characters after which a dumb quote becomes a closing quote.
+CLOSE_DOUBLE = frozenset(string.ascii_letters + string.digits + ".,?!;:'\"")
+CLOSE_SINGLE = CLOSE_DOUBLE - {'"'}
+
+
+@lru_cache(maxsize=8192)
 def smartify(text: str) -> str:
     """Augment text with smart typography.
 
     This replaces dumb quotes with curly quotes, "..." with ellipses, and "--"
-    with em dashes.
+    with em dashes. It makes a single pass over the text. Results are cached,
+    since rebuilds in watch mode render mostly unchanged text.
     """
-    text = re.sub(r"([a-zA-Z0-9.,?!;:\'\"])\"", r"\1”", text)
-    text = text.replace(r'"', r"“")
-    text = re.sub(r"([a-zA-Z0-9.,?!;:\'\"])'", r"\1’", text)
-    text = text.replace(r"'", r"‘")
-    text = text.replace(r"...", r"…")
-    text = text.replace(r"--", r"—")
-    return text
+    # Index of the last quote that became a closing quote. A closing quote
+    # cannot also be what makes the next quote closing (e.g. x"" is x”“).
+    closed = -1
+
+    def replace(match: Match[str]) -> str:
+        nonlocal closed
+        s = match.group()
+        if s == "...":
+            return "…"
+        if s == "--":
+            return "—"
+        i = match.start()
+        prev = text[i - 1] if i else ""
+        allowed = CLOSE_DOUBLE if s == '"' else CLOSE_SINGLE
+        if prev in allowed and not (prev == s and closed == i - 1):
+            closed = i
+            return "”" if s == '"' else "’"
+        return "“" if s == '"' else "‘"
+
+    return SMART_PATTERN.sub(replace, text)
 
 
 class ExtendedHeading(Heading):
@@ -78,10 +109,24 @@ class ExtendedHeading(Heading):
         if self.children:
             last = self.children[-1]
             if isinstance(last, RawText):
-                match = re.search(r" {#([^ }]+)}(?:$|\n)", last.content)
-                if match:
-                    last.content = last.content[: match.start()]
-                    self.identifier = match.group(1)
+                self.parse_identifier(last)
+
+    def parse_identifier(self, last: RawText):
+        """Move an explicit id like "{#some-id}" from the text to self.identifier.
+
+        Headings are one line, so this uses string methods instead of a regex.
+        """
+        s = last.content
+        end = len(s) - 1 if s.endswith("}\n") else len(s)
+        if not s.endswith("}", 0, end):
+            return
+        i = s.rfind(" {#", 0, end)
+        if i == -1:
+            return
+        identifier = s[i + 3 : end - 1]
+        if identifier and " " not in identifier and "}" not in identifier:
+            last.content = s[:i]
+            self.identifier = identifier
 
 
 class InlineMacro(SpanToken):
@@ -105,6 +150,13 @@ class InlineMacro(SpanToken):
         self.name = match.group(1)
         self.arg = match.group(2)
 
+    @classmethod
+    def find(cls, text):
+        # Most text has no macros, so avoid running the regex on it.
+        if "@" not in text:
+            return ()
+        return cls.pattern.finditer(text)
+
 
 class BlockMacro(BlockToken):
 
@@ -131,34 +183,41 @@ class BlockMacro(BlockToken):
 
     pattern = re.compile(r"^@([a-z]+[a-z0-9]*)(?:{([^}]*)})?(:)?$")
 
-    name = ""
-    arg = ""
-    colon = ""
+    # Match from start() for read() to consume. Mistletoe calls them as class
+    # methods, so this is thread-local to allow parsing in several threads.
+    state = threading.local()
 
     def __init__(self, result):
         self.name, self.arg, self.colon, lines = result
-        super().__init__(lines, block_token.tokenize)
+        if lines:
+            super().__init__(lines, block_token.tokenize)
+        else:
+            # Most macros have no blockquote, so skip the tokenizer setup.
+            self.children = []
 
     @classmethod
     def start(cls, line):
+        # This is called for every block line, and most don't start with "@".
+        if not line.startswith("@"):
+            return False
         match = cls.pattern.match(line)
         if match is None:
             return False
-        cls.name = match.group(1)
-        cls.arg = match.group(2)
-        cls.colon = match.group(3)
+        cls.state.match = match
         return True
 
     @classmethod
     def read(cls, lines):
         next(lines)
+        name, arg, colon = cls.state.match.groups()
+        if not colon:
+            return name, arg, colon, ()
         line_buffer = []
-        if cls.colon:
-            for line in lines:
-                if not Quote.start(line):
-                    break
-                line_buffer.append(line)
-        return cls.name, cls.arg, cls.colon, line_buffer
+        for line in lines:
+            if not Quote.start(line):
+                break
+            line_buffer.append(line)
+        return name, arg, colon, line_buffer
 
 
 class RenderOptions(NamedTuple):
@@ -173,15 +232,27 @@ class ZFMRenderer(HTMLRenderer):
 
     """Renderer from ZFM to HTML."""
 
+    # The same link targets recur within and across articles, and escaping them
+    # only depends on the target, so share one cache for all renderers.
+    escape_url = staticmethod(lru_cache(maxsize=1024)(HTMLRenderer.escape_url))
+
     def __init__(self, ctx: Context, options: RenderOptions):
         super().__init__(ExtendedHeading, BlockMacro, InlineMacro)
         ctx.renderer = self
         self.ctx = ctx
         self.options = options
+        # Macros only change between builds, and a renderer lasts for one.
+        self.macros = ctx.project.macros or {}
         self.inline_code_macro = ctx.project.cfg["inline_code_macro"]
         self.smart_typography = ctx.project.cfg["smart_typography"]
         self.image_links = ctx.project.cfg["image_links"]
         self.image_title_from_alt = ctx.project.cfg["image_title_from_alt"]
+        # The config is fixed for the renderer's lifetime, so dispatch straight
+        # to the plain implementation rather than checking it per token.
+        if not self.inline_code_macro:
+            self.render_map["InlineCode"] = super().render_inline_code
+        if not self.smart_typography:
+            self.render_map["RawText"] = super().render_raw_text
 
     def error(self, message: str) -> str:
         """Log an error and render it."""
@@ -201,7 +272,7 @@ class ZFMRenderer(HTMLRenderer):
     def run_macro(
         self, name: str, arg: str, block: Optional[List[BlockToken]], kind: Kind
     ) -> str:
-        macro = self.ctx.project.get_macro(name)
+        macro = self.macros.get(name)
         if not macro:
             return self.error(f"{name}: undefined macro")
         if macro.kind is not kind:
@@ -237,21 +308,23 @@ class ZFMRenderer(HTMLRenderer):
         return self.run_macro(token.name, token.arg, block, Kind.BLOCK)
 
     def render_extended_heading(self, token: Heading) -> str:
-        # TODO: Make this driven by the builder.
-        if self.ctx.builder.name == "latex":
-            template = "<h{level} id={id}>{inner}</h{level}>"
-            identifier = f"{self.ctx.article.node.ref}:{token.identifier}"
-        else:
-            template = (
-                '<a id="{id}" data-hs-anchor="true"></a><h{level}>{inner}</h{level}>'
-            )
-            identifier = token.identifier
         level = max(1, min(6, token.level + self.options.shift_headings_by))
         inner = self.render_inner(token)
-        return template.format(level=level, id=identifier, inner=inner)
+        # Headings from includes are not sectioned, so they may have no id.
+        identifier = token.identifier or ""
+        # TODO: Make this driven by the builder.
+        if self.ctx.builder.name == "latex":
+            ref = self.ctx.article.node.ref
+            return f"<h{level} id={ref}:{identifier}>{inner}</h{level}>"
+        return (
+            f'<a id="{identifier}" data-hs-anchor="true"></a>'
+            f"<h{level}>{inner}</h{level}>"
+        )
 
     def render_raw_text(self, token: RawText) -> str:
-        if self.smart_typography:
+        # Most text has nothing to replace. Skip the cache lookup for it, so
+        # that it doesn't evict entries for text that does.
+        if self.smart_typography and not SMART_TRIGGERS.isdisjoint(token.content):
             token.content = smartify(token.content)
         return super().render_raw_text(token)
 
@@ -264,14 +337,10 @@ class ZFMRenderer(HTMLRenderer):
         # Need noopener for TOC links to work in HubSpot. Otherwise it scrolls
         # past a bit. Good idea in general to use noopener.
         # TODO: Make this driven by the builder.
-        template = '<a href="{target}"{title} rel="noopener">{inner}</a>'
         target = self.escape_url(token.target)
-        if token.title:
-            title = ' title="{}"'.format(self.escape_html(token.title))
-        else:
-            title = ""
+        title = f' title="{self.escape_html(token.title)}"' if token.title else ""
         inner = self.render_inner(token)
-        return template.format(target=target, title=title, inner=inner)
+        return f'<a href="{target}"{title} rel="noopener">{inner}</a>'
 
     def render_image(self, token: Image) -> str:
         if self.options.exclude_images:
@@ -297,14 +366,14 @@ class ZFMRenderer(HTMLRenderer):
                 size_style += f"height:{height}px;"
             if size_style:
                 size += f' style="{size_style}"'
-        template = (
-            '<img src="{src}" alt="{alt}"{title} class="hs-image-align-none"{size} />'
-        )
         alt = self.render_to_plain(token)
         if token.title:
-            title = ' title="{}"'.format(self.escape_html(token.title))
+            title = f' title="{self.escape_html(token.title)}"'
         elif self.image_title_from_alt:
-            title = ' title="{}"'.format(alt)
+            title = f' title="{alt}"'
         else:
             title = ""
-        return template.format(src=token.src, alt=alt, title=title, size=size)
+        return (
+            f'<img src="{token.src}" alt="{alt}"{title} class="hs-image-align-none"'
+            f"{size} />"
+        )